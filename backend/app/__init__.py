@@ -1,20 +1,60 @@
 import os
+import redis
+from celery import Celery, Task
 from flask import Flask
+from flask_caching import Cache
 from flask_cors import CORS
 from dotenv import load_dotenv
 
+from app.json_provider import OrjsonProvider
+
 # Load environment variables
 load_dotenv()
 
+# Response cache for read-heavy endpoints (initialized in create_app)
+cache = Cache()
+
+def celery_init_app(app: Flask) -> Celery:
+    """Create the Celery app, running every task inside the Flask app context."""
+    class FlaskTask(Task):
+        def __call__(self, *args, **kwargs):
+            with app.app_context():
+                return self.run(*args, **kwargs)
+    
+    celery_app = Celery(app.name, task_cls=FlaskTask)
+    celery_app.config_from_object(app.config['CELERY'])
+    celery_app.set_default()
+    app.extensions['celery'] = celery_app
+    return celery_app
+
+
 def create_app():
     """Create and configure the Flask application."""
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
     
     # Enable CORS for frontend
     CORS(app, origins=["http://localhost:5173", "http://127.0.0.1:5173"])
     
     # Configuration
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
+    app.config['REDIS_URL'] = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    
+    # Background jobs (scraping) run on Celery workers, with Redis as broker
+    # and result backend so every API worker sees the same job state
+    app.config['CELERY'] = {
+        'broker_url': app.config['REDIS_URL'],
+        'result_backend': app.config['REDIS_URL'],
+        'task_track_started': True,
+    }
+    celery_init_app(app)
+    app.extensions['redis'] = redis.Redis.from_url(app.config['REDIS_URL'], decode_responses=True)
+    
+    cache.init_app(app, config={
+        'CACHE_TYPE': 'RedisCache',
+        'CACHE_REDIS_URL': app.config['REDIS_URL'],
+        'CACHE_KEY_PREFIX': 'pyq:cache:',
+    })
     
     # Register blueprints
     from app.routes.papers import papers_bp
@@ -1,3 +1,3 @@
-from .paper import Paper
+from .paper import Paper, tokenize, normalize_search
 
-__all__ = ['Paper']
+__all__ = ['Paper', 'tokenize', 'normalize_search']
@@ -1,9 +1,22 @@
-from dataclasses import dataclass, asdict
-from typing import Optional
+import re
+from dataclasses import dataclass, fields
+from typing import Optional, List
 from datetime import datetime
 
+_WORD_RE = re.compile(r'\w+')
 
-@dataclass
+
+def tokenize(text: str) -> List[str]:
+    """Split text into the lowercased words used by the search index."""
+    return _WORD_RE.findall(text.lower())
+
+
+def normalize_search(text: str) -> str:
+    """Lowercase text and collapse whitespace, as stored in search_prefix."""
+    return ' '.join(text.lower().split())
+
+
+@dataclass(slots=True)
 class Paper:
     """Model representing a question paper."""
     id: Optional[str] = None
@@ -22,18 +35,53 @@ class Paper:
     
     def to_dict(self) -> dict:
         """Convert to dictionary for Firestore."""
-        data = asdict(self)
-        if self.created_at:
-            data['created_at'] = self.created_at.isoformat()
-        if self.updated_at:
-            data['updated_at'] = self.updated_at.isoformat()
-        return data
+        return {
+            'id': self.id,
+            'title': self.title,
+            'subject_code': self.subject_code,
+            'subject_name': self.subject_name,
+            'year': self.year,
+            'semester': self.semester,
+            'branch': self.branch,
+            'exam_type': self.exam_type,
+            'pdf_url': self.pdf_url,
+            'storage_url': self.storage_url,
+            'portal': self.portal,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
+    
+    def search_tokens(self) -> List[str]:
+        """Distinct words of the title, subject name and subject code (for array_contains search)."""
+        return sorted(set(tokenize(f"{self.title} {self.subject_name} {self.subject_code}")))
+    
+    def search_prefix(self) -> str:
+        """Lowercased "subject_name subject_code title" (for prefix range search)."""
+        return normalize_search(f"{self.subject_name} {self.subject_code} {self.title}")
+    
+    @staticmethod
+    def raw_dict_from_firestore(doc) -> dict:
+        """
+        Build the to_dict() shape straight from a Firestore document, without
+        creating a Paper. Timestamps stay datetimes for the JSON provider.
+        """
+        data = doc.to_dict()
+        raw = {name: data.get(name, default) for name, default in _FIELD_DEFAULTS}
+        raw['id'] = doc.id
+        return raw
     
     @classmethod
     def from_dict(cls, data: dict) -> 'Paper':
         """Create Paper from Firestore document."""
+        # Firestore returns timestamps as datetimes; strings come from papers
+        # stored before server timestamps were used
         if 'created_at' in data and isinstance(data['created_at'], str):
             data['created_at'] = datetime.fromisoformat(data['created_at'])
         if 'updated_at' in data and isinstance(data['updated_at'], str):
             data['updated_at'] = datetime.fromisoformat(data['updated_at'])
-        return cls(**data)
+        # Ignore stored fields that are not part of the model (e.g. search_tokens)
+        return cls(**{k: v for k, v in data.items() if k in _FIELD_NAMES})
+
+
+_FIELD_NAMES = {f.name for f in fields(Paper)}
+_FIELD_DEFAULTS = [(f.name, f.default) for f in fields(Paper)]
@@ -1,10 +1,30 @@
 from flask import Blueprint, request, jsonify
-from app.services.firebase_service import firebase_service
+from app import cache
+from app.services.firebase_service import get_firebase_service
 
 papers_bp = Blueprint('papers', __name__)
 
+# Cache lifetimes in seconds. Papers only change while a scrape runs, and
+# run_scrape clears the cache when it finishes.
+PAPERS_CACHE_TIMEOUT = 60
+FILTERS_CACHE_TIMEOUT = 600
+
+
+def _is_success(rv) -> bool:
+    """Only cache successful responses (error views return a tuple)."""
+    return getattr(rv, 'status_code', None) == 200
+
+
+def _public_response(payload: dict, max_age: int):
+    """JSON response that browsers and CDNs may cache for max_age seconds."""
+    response = jsonify(payload)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response
+
 
 @papers_bp.route('/papers', methods=['GET'])
+@cache.cached(timeout=PAPERS_CACHE_TIMEOUT, query_string=True, response_filter=_is_success)
 def get_papers():
     """
     Get papers with optional filters.
@@ -16,7 +36,7 @@ def get_papers():
         - subject: Filter by subject name
         - search: Search term
         - limit: Max results (default 50)
-        - offset: Pagination offset (default 0)
+        - cursor: Opaque cursor from a previous response's next_cursor
     """
     try:
         year = request.args.get('year')
@@ -25,26 +45,34 @@ def get_papers():
         subject = request.args.get('subject')
         search = request.args.get('search')
         limit = int(request.args.get('limit', 50))
-        offset = int(request.args.get('offset', 0))
+        cursor = request.args.get('cursor')
+        next_cursor = None
         
         if search:
-            papers = firebase_service.search_papers(search, limit=limit)
+            papers = [p.to_dict() for p in get_firebase_service().search_papers(search, limit=limit)]
         else:
-            papers = firebase_service.get_papers(
+            papers, next_cursor = get_firebase_service().get_papers_raw(
                 year=year,
                 semester=semester,
                 branch=branch,
                 subject=subject,
                 limit=limit,
-                offset=offset
+                start_after=cursor
             )
         
-        return jsonify({
+        return _public_response({
             'success': True,
-            'data': [p.to_dict() for p in papers],
-            'count': len(papers)
-        })
+            'data': papers,
+            'count': len(papers),
+            'next_cursor': next_cursor
+        }, PAPERS_CACHE_TIMEOUT)
         
+    except ValueError as e:
+        # Bad limit or pagination cursor
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -56,7 +84,7 @@ def get_papers():
 def get_paper(paper_id: str):
     """Get a single paper by ID."""
     try:
-        paper = firebase_service.get_paper(paper_id)
+        paper = get_firebase_service().get_paper(paper_id)
         
         if not paper:
             return jsonify({
@@ -80,7 +108,7 @@ def get_paper(paper_id: str):
 def download_paper(paper_id: str):
     """Get download URL for a paper."""
     try:
-        paper = firebase_service.get_paper(paper_id)
+        paper = get_firebase_service().get_paper(paper_id)
         
         if not paper:
             return jsonify({
@@ -107,21 +135,17 @@ def download_paper(paper_id: str):
 
 
 @papers_bp.route('/filters', methods=['GET'])
+@cache.cached(timeout=FILTERS_CACHE_TIMEOUT, response_filter=_is_success)
 def get_filters():
     """Get available filter options."""
     try:
-        years = firebase_service.get_unique_values('year')
-        semesters = firebase_service.get_unique_values('semester')
-        branches = firebase_service.get_unique_values('branch')
+        # years, semesters and branches in a single Firestore read
+        options = get_firebase_service().get_filter_options()
         
-        return jsonify({
+        return _public_response({
             'success': True,
-            'data': {
-                'years': years,
-                'semesters': semesters,
-                'branches': branches
-            }
-        })
+            'data': options
+        }, FILTERS_CACHE_TIMEOUT)
         
     except Exception as e:
         return jsonify({
@@ -155,7 +179,7 @@ def find_papers_by_subjects():
             }), 400
         
         # Perform fuzzy search
-        results = firebase_service.fuzzy_search_papers(
+        results = get_firebase_service().fuzzy_search_papers(
             subject_names=subjects,
             threshold=threshold,
             limit=limit
@@ -1,135 +1,347 @@
-import threading
-from flask import Blueprint, request, jsonify
-from app.services.firebase_service import firebase_service
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Generator, Optional
+from celery import shared_task
+from flask import Blueprint, request, jsonify, current_app
+from app import cache
+from app.services.firebase_service import FirebaseService, get_firebase_service
 from app.services.portal1_scraper import Portal1Scraper
 from app.services.portal2_scraper import Portal2Scraper
 
 scraper_bp = Blueprint('scraper', __name__)
 
-# Global scraper reference for stop functionality
-_current_scraper = None
-_scraper_lock = threading.Lock()
+# Number of scraped papers checked for duplicates per Firestore query
+DEDUP_BATCH_SIZE = 30
 
-# Track scraping status with stop event
-scrape_status = {
-    'is_running': False,
-    'stop_requested': False,
-    'portal': None,
-    'progress': 0,
-    'skipped': 0,
-    'total': 0,
-    'errors': [],
-    'message': ''
-}
+# Number of new papers saved per bulk write
+BULK_WRITE_SIZE = 500
 
+# Minimum seconds between task progress updates
+PROGRESS_INTERVAL = 0.25
 
-def run_scrape(portal: str, years: list = None, upload_to_storage: bool = False, workers: int = 5):
+# Minimum seconds between checks of the Redis stop flag
+STOP_CHECK_INTERVAL = 0.25
+
+# Redis keys shared by the API workers and the Celery workers
+CURRENT_TASK_KEY = 'pyq:scrape:current_task'
+STOP_KEY_PREFIX = 'pyq:scrape:stop:'
+KEY_TTL = 24 * 60 * 60
+
+# Celery states in which a scrape is still queued or running
+ACTIVE_STATES = ('PENDING', 'RECEIVED', 'STARTED', 'PROGRESS', 'RETRY')
+
+# Celery states in which a worker should be executing the scrape
+EXECUTING_STATES = ('STARTED', 'PROGRESS', 'RETRY')
+
+# Seconds to wait for workers to report their active tasks
+INSPECT_TIMEOUT = 1.0
+
+# Delete CURRENT_TASK_KEY only if it still names the given task
+RELEASE_TASK_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _new_status(portal: str = None) -> dict:
+    """Build an empty scrape status."""
+    return {
+        'is_running': False,
+        'stop_requested': False,
+        'portal': portal,
+        'progress': 0,
+        'skipped': 0,
+        'total': 0,
+        'errors': [],
+        'message': ''
+    }
+
+
+def _redis():
+    """Redis client shared with Celery (configured in create_app)."""
+    return current_app.extensions['redis']
+
+
+def _stop_requested(task_id: str) -> bool:
+    """Check whether /scrape/stop was called for this task."""
+    return bool(_redis().exists(STOP_KEY_PREFIX + task_id))
+
+
+def _batches(papers, size: int, stop_requested) -> Generator[list, None, None]:
+    """Group scraped papers into lists of `size`, ending early once stop_requested() is true."""
+    batch = []
+    for paper in papers:
+        if stop_requested():
+            return
+        
+        batch.append(paper)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    
+    if batch:
+        yield batch
+
+
+def _filter_new_papers(status: dict, papers: list, seen_urls: set, seen_keys: set) -> list:
     """
-    Background task to run scraping.
+    Drop papers that are already stored.
     
-    By default, only stores PDF links (not the actual files).
-    This is faster and doesn't use storage space.
+    Existing papers are looked up with one batched query per batch instead of
+    two queries per paper. seen_urls / seen_keys carry the papers accepted
+    earlier in this run so duplicates within the run are caught too.
+    """
+    firebase_service = get_firebase_service()
+    seen_urls.update(firebase_service.get_existing_pdf_urls([p.pdf_url for p in papers]))
+    seen_keys.update(firebase_service.get_existing_metadata_keys(papers))
     
-    Args:
-        portal: 'portal1' or 'portal2'
-        years: Optional list of years to filter (for portal2)
-        upload_to_storage: Whether to upload PDFs to Firebase Storage
-        workers: Number of concurrent workers (default 5, for portal1)
+    new_papers = []
     
-    Duplicate detection:
-    1. Checks if exact PDF URL already exists
-    2. Checks if similar paper exists (same subject_code + year + semester)
-    """
-    global scrape_status, _current_scraper
+    for paper in papers:
+        # Check for duplicates using multiple methods
+        # 1. Check if exact PDF URL exists
+        if paper.pdf_url in seen_urls:
+            status['message'] = f'Skipping (URL exists): {paper.title}'
+            status['skipped'] += 1
+        
+        # 2. Check if similar paper exists (same subject_code + year + semester)
+        elif paper.subject_code and paper.year and FirebaseService.metadata_key(paper) in seen_keys:
+            status['message'] = f'Skipping (metadata exists): {paper.title}'
+            status['skipped'] += 1
+        
+        else:
+            new_papers.append(paper)
+            seen_urls.add(paper.pdf_url)
+            seen_keys.update(FirebaseService.metadata_match_keys(
+                paper.subject_code, paper.year, paper.semester, paper.exam_type
+            ))
     
-    scrape_status['is_running'] = True
-    scrape_status['stop_requested'] = False
-    scrape_status['portal'] = portal
-    scrape_status['progress'] = 0
-    scrape_status['skipped'] = 0
-    scrape_status['errors'] = []
-    scrape_status['message'] = f'Starting scrape for {portal}...'
+    return new_papers
+
+
+def _finish_upload(status: dict, paper, upload: Optional[Future] = None):
+    """Wait for a paper's (optional) Storage upload and record its URL."""
+    if upload is None:
+        return
+    
+    try:
+        paper.storage_url = upload.result()
+        status['message'] = f'Uploaded: {paper.title}'
+    except Exception as e:
+        status['errors'].append(f'Upload failed for {paper.title}: {str(e)}')
+
+
+def _write_papers(status: dict, papers: list):
+    """Save new papers' metadata to Firestore (includes the original PDF links)."""
+    try:
+        saved = get_firebase_service().add_papers_bulk(papers)
+        status['progress'] += saved
+        status['message'] = f'Saved {saved} papers'
+        if saved < len(papers):
+            status['errors'].append(f'Failed to save {len(papers) - saved} papers')
+    except Exception as e:
+        status['errors'].append(f'Error saving {len(papers)} papers: {str(e)}')
+
+
+def _scrape_portal(task, status: dict, portal: str, years: list = None,
+                   upload_to_storage: bool = False, workers: int = 5):
+    """
+    Scrape a single portal, reporting progress through the task state.
     
-    scraper = None
+    Uploads to Storage run on a pool of `workers` threads while scraping
+    continues; papers are saved in scrape order as their uploads finish,
+    BULK_WRITE_SIZE at a time.
+    """
+    status['portal'] = portal
+    status['progress'] = 0
+    status['skipped'] = 0
+    status['errors'] = []
+    status['message'] = f'Starting scrape for {portal}...'
+    task.update_state(state='PROGRESS', meta=status)
     
     try:
         if portal == 'portal1':
-            scraper = Portal1Scraper(max_workers=workers)
-            with _scraper_lock:
-                _current_scraper = scraper
+            validators = get_firebase_service().get_scrape_validators(portal)
+            scraper = Portal1Scraper(max_workers=workers, validators=validators)
             papers_generator = scraper.scrape_all(concurrent=True)
         elif portal == 'portal2':
             scraper = Portal2Scraper(headless=True)
-            with _scraper_lock:
-                _current_scraper = scraper
             papers_generator = scraper.scrape_all(years=years)
         else:
-            scrape_status['message'] = f'Unknown portal: {portal}'
-            scrape_status['is_running'] = False
+            status['message'] = f'Unknown portal: {portal}'
             return
         
-        count = 0
-        skipped = 0
+        last_stop_check = time.monotonic()
         
-        for paper in papers_generator:
-            # Check if stop was requested
-            if scrape_status['stop_requested']:
-                scrape_status['message'] = f'Stopped! Scraped {count} papers, skipped {skipped} duplicates.'
-                break
-            
+        def stop_requested() -> bool:
+            # Called per scraped paper; each check is a Redis round trip, so space them out
+            nonlocal last_stop_check
+            now = time.monotonic()
+            if not status['stop_requested'] and now - last_stop_check >= STOP_CHECK_INTERVAL:
+                last_stop_check = now
+                if _stop_requested(task.request.id):
+                    status['stop_requested'] = True
+                    scraper.stop()
+            return status['stop_requested']
+        
+        last_update = time.monotonic()
+        
+        def publish_progress(force: bool = False):
+            # Each update is a write to the result backend, so coalesce them
+            nonlocal last_update
+            now = time.monotonic()
+            if force or now - last_update >= PROGRESS_INTERVAL:
+                task.update_state(state='PROGRESS', meta=status)
+                last_update = now
+        
+        seen_urls = set()
+        seen_keys = set()
+        
+        # New papers waiting on their upload, capped to bound memory
+        pending = deque()
+        max_pending = 2 * workers
+        
+        # Uploaded papers waiting to be written in one bulk write
+        to_write = []
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
             try:
-                # Check for duplicates using multiple methods
-                # 1. Check if exact PDF URL exists
-                if firebase_service.paper_exists(paper.pdf_url):
-                    scrape_status['message'] = f'Skipping (URL exists): {paper.title}'
-                    skipped += 1
-                    scrape_status['skipped'] = skipped
-                    continue
-                
-                # 2. Check if similar paper exists (same subject_code + year + semester)
-                if paper.subject_code and firebase_service.paper_exists_by_metadata(
-                    subject_code=paper.subject_code,
-                    year=paper.year,
-                    semester=paper.semester,
-                    exam_type=paper.exam_type
-                ):
-                    scrape_status['message'] = f'Skipping (metadata exists): {paper.title}'
-                    skipped += 1
-                    scrape_status['skipped'] = skipped
-                    continue
-                
-                # Optionally upload PDF to storage (disabled by default)
-                if upload_to_storage:
-                    try:
-                        storage_path = f"papers/{portal}/{paper.year}/{paper.branch}/{paper.title}.pdf"
-                        storage_url = firebase_service.upload_pdf(paper.pdf_url, storage_path)
-                        paper.storage_url = storage_url
-                        scrape_status['message'] = f'Uploaded: {paper.title}'
-                    except Exception as e:
-                        scrape_status['errors'].append(f'Upload failed for {paper.title}: {str(e)}')
-                
-                # Save paper metadata to Firestore (includes the original PDF link)
-                firebase_service.add_paper(paper)
-                count += 1
-                scrape_status['progress'] = count
-                scrape_status['message'] = f'Saved: {paper.title}'
+                for batch in _batches(papers_generator, DEDUP_BATCH_SIZE, stop_requested):
+                    for paper in _filter_new_papers(status, batch, seen_urls, seen_keys):
+                        upload = None
+                        if upload_to_storage:
+                            storage_path = FirebaseService.storage_path(portal, paper.pdf_url)
+                            upload = executor.submit(
+                                get_firebase_service().upload_pdf, paper.pdf_url, storage_path, paper.title
+                            )
+                        pending.append((paper, upload))
+                        
+                        while len(pending) > max_pending:
+                            paper, upload = pending.popleft()
+                            _finish_upload(status, paper, upload)
+                            to_write.append(paper)
+                    
+                    if len(to_write) >= BULK_WRITE_SIZE:
+                        _write_papers(status, to_write)
+                        to_write = []
+                        publish_progress(force=True)
+                    else:
+                        publish_progress()
+            finally:
+                # Save papers already accepted, even if scraping or a dedup
+                # query failed part way: wait for uploads still in flight
+                while pending:
+                    paper, upload = pending.popleft()
+                    _finish_upload(status, paper, upload)
+                    to_write.append(paper)
                 
-            except Exception as e:
-                scrape_status['errors'].append(f'Error processing {paper.title}: {str(e)}')
+                if to_write:
+                    _write_papers(status, to_write)
         
-        if not scrape_status['stop_requested']:
-            scrape_status['message'] = f'Completed! Scraped {count} new papers, skipped {skipped} duplicates.'
-        scrape_status['total'] = count
+        count = status['progress']
+        skipped = status['skipped']
+        if status['stop_requested']:
+            status['message'] = f'Stopped! Scraped {count} papers, skipped {skipped} duplicates.'
+        elif getattr(scraper, 'not_modified', False):
+            status['message'] = 'Completed! Portal unchanged since the last scrape.'
+        else:
+            status['message'] = f'Completed! Scraped {count} new papers, skipped {skipped} duplicates.'
+        status['total'] = count
         
+        # Only skip an unchanged index next time if everything on it was saved
+        if portal == 'portal1' and not status['stop_requested'] and not status['errors']:
+            get_firebase_service().set_scrape_validators(portal, scraper.validators)
+    
     except Exception as e:
-        scrape_status['message'] = f'Scrape failed: {str(e)}'
-        scrape_status['errors'].append(str(e))
+        status['message'] = f'Scrape failed: {str(e)}'
+        status['errors'].append(str(e))
+
+
+@shared_task(bind=True)
+def run_scrape(self, portal: str, years: list = None, upload_to_storage: bool = False, workers: int = 5) -> dict:
+    """
+    Celery task to run scraping.
+    
+    By default, only stores PDF links (not the actual files).
+    This is faster and doesn't use storage space.
     
+    Args:
+        portal: 'portal1', 'portal2' or 'both' (runs portal1 then portal2)
+        years: Optional list of years to filter (for portal2)
+        upload_to_storage: Whether to upload PDFs to Firebase Storage
+        workers: Number of concurrent workers (default 5, for portal1 and uploads)
+    
+    Duplicate detection (batched, DEDUP_BATCH_SIZE papers per query):
+    1. Checks if exact PDF URL already exists
+    2. Checks if similar paper exists (same subject_code + year + semester)
+    
+    Progress is published with update_state(state='PROGRESS') and the final
+    status is returned as the task result.
+    """
+    portals = ['portal1', 'portal2'] if portal == 'both' else [portal]
+    status = _new_status(portal)
+    status['is_running'] = True
+    
+    try:
+        for name in portals:
+            _scrape_portal(self, status, name, years, upload_to_storage, workers)
+            if status['stop_requested']:
+                break
     finally:
-        scrape_status['is_running'] = False
-        scrape_status['stop_requested'] = False
-        with _scraper_lock:
-            _current_scraper = None
+        status['is_running'] = False
+        
+        # New papers change /papers and /filters responses
+        cache.clear()
+        
+        # CURRENT_TASK_KEY is kept (until its TTL) so /scrape/status keeps
+        # reporting the final status; a finished task doesn't block /scrape
+        _redis().delete(STOP_KEY_PREFIX + self.request.id)
+    
+    return status
+
+
+def _task_status(task_id: str) -> dict:
+    """Build the scrape status for a task from its Celery state."""
+    result = run_scrape.AsyncResult(task_id)
+    state = result.state
+    
+    if isinstance(result.info, dict):
+        status = dict(result.info)
+    else:
+        status = _new_status()
+    
+    status['is_running'] = state in ACTIVE_STATES
+    status['task_id'] = task_id
+    status['state'] = state
+    
+    if state in ('PENDING', 'RECEIVED'):
+        status['message'] = 'Waiting for a worker...'
+    elif state == 'REVOKED':
+        status['message'] = 'Stopped!'
+    elif state == 'FAILURE':
+        status['message'] = f'Scrape failed: {result.info}'
+    
+    return status
+
+
+def _current_task_id():
+    """Id of the scrape task started most recently, if it is still tracked."""
+    return _redis().get(CURRENT_TASK_KEY)
+
+
+def _release_current_task(task_id: str):
+    """Stop tracking task_id as the current scrape, unless another has replaced it."""
+    _redis().eval(RELEASE_TASK_LUA, 1, CURRENT_TASK_KEY, task_id)
+
+
+def _task_is_executing(task_id: str) -> bool:
+    """Whether any worker reports task_id among the tasks it is executing."""
+    active = current_app.extensions['celery'].control.inspect(timeout=INSPECT_TIMEOUT).active() or {}
+    return any(task['id'] == task_id for tasks in active.values() for task in tasks)
 
 
 @scraper_bp.route('/scrape', methods=['POST'])
@@ -143,15 +355,6 @@ def start_scrape():
         - upload_to_storage: Whether to upload PDFs to Firebase Storage (default false)
         - workers: Number of concurrent workers (1-10, default 5)
     """
-    global scrape_status
-    
-    if scrape_status['is_running']:
-        return jsonify({
-            'success': False,
-            'error': 'A scrape is already running',
-            'status': scrape_status
-        }), 409
-    
     data = request.get_json() or {}
     portal = data.get('portal', 'portal1')
     years = data.get('years')
@@ -164,56 +367,91 @@ def start_scrape():
             'error': 'Invalid portal. Use portal1, portal2, or both'
         }), 400
     
-    # Start scraping in background thread
-    if portal == 'both':
-        # Run both sequentially
-        def run_both():
-            run_scrape('portal1', years, upload_to_storage, workers)
-            if not scrape_status['stop_requested']:
-                run_scrape('portal2', years, upload_to_storage, workers)
+    # Claim the current-scrape slot atomically, so concurrent requests can't
+    # both start one; a finished task's slot is released and claimed again
+    task_id = str(uuid.uuid4())
+    while not _redis().set(CURRENT_TASK_KEY, task_id, nx=True, ex=KEY_TTL):
+        current_id = _current_task_id()
+        if not current_id:
+            continue
         
-        thread = threading.Thread(target=run_both)
-    else:
-        thread = threading.Thread(target=run_scrape, args=(portal, years, upload_to_storage, workers))
+        current_status = _task_status(current_id)
+        if current_status['is_running']:
+            return jsonify({
+                'success': False,
+                'error': 'A scrape is already running',
+                'status': current_status
+            }), 409
+        
+        _release_current_task(current_id)
     
-    thread.daemon = True
-    thread.start()
+    # Queue the scrape on a Celery worker
+    try:
+        task = run_scrape.apply_async(args=(portal, years, upload_to_storage, workers), task_id=task_id)
+    except Exception:
+        _release_current_task(task_id)
+        raise
     
     return jsonify({
         'success': True,
         'message': f'Scrape started for {portal}',
-        'status': scrape_status
+        'task_id': task.id,
+        'status': _task_status(task.id)
     })
 
 
 @scraper_bp.route('/scrape/status', methods=['GET'])
 def get_scrape_status():
-    """Get the current scraping status."""
+    """
+    Get the scraping status.
+    
+    Query params:
+        - task_id: Task to report on (default: the most recently started scrape)
+    """
+    task_id = request.args.get('task_id') or _current_task_id()
+    
     return jsonify({
         'success': True,
-        'data': scrape_status
+        'data': _task_status(task_id) if task_id else _new_status()
     })
 
 
 @scraper_bp.route('/scrape/stop', methods=['POST'])
 def stop_scrape():
-    """Stop the current scrape."""
-    global scrape_status, _current_scraper
+    """
+    Stop a scrape.
     
-    if not scrape_status['is_running']:
+    Body:
+        - task_id: Task to stop (default: the most recently started scrape)
+    """
+    data = request.get_json(silent=True) or {}
+    task_id = data.get('task_id') or _current_task_id()
+    
+    status = _task_status(task_id) if task_id else _new_status()
+    if not status['is_running']:
         return jsonify({
             'success': False,
             'error': 'No scrape is currently running'
         }), 400
     
-    # Set stop flag - the scraper loop will check this
-    scrape_status['stop_requested'] = True
-    scrape_status['message'] = 'Stopping...'
+    # Set stop flag - the scrape loop will check this and stop the scraper
+    _redis().set(STOP_KEY_PREFIX + task_id, 1, ex=KEY_TTL)
     
-    # Also signal the scraper directly if it exists
-    with _scraper_lock:
-        if _current_scraper and hasattr(_current_scraper, 'stop'):
-            _current_scraper.stop()
+    # Drop the task if no worker has picked it up yet
+    if status['state'] in ('PENDING', 'RECEIVED'):
+        run_scrape.AsyncResult(task_id).revoke()
+    
+    # A task left STARTED/PROGRESS by a killed worker would never read the
+    # flag and would block /scrape until KEY_TTL: end it and free the slot
+    elif status['state'] in EXECUTING_STATES and not _task_is_executing(task_id):
+        run_scrape.AsyncResult(task_id).revoke(terminate=True)
+        run_scrape.backend.mark_as_revoked(task_id, reason='worker lost')
+        _release_current_task(task_id)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Stopped - no worker was running this scrape any more'
+        })
     
     return jsonify({
         'success': True,
@@ -1,5 +1,5 @@
-from .firebase_service import firebase_service, FirebaseService
+from .firebase_service import get_firebase_service, FirebaseService
 from .portal1_scraper import Portal1Scraper
 from .portal2_scraper import Portal2Scraper
 
-__all__ = ['firebase_service', 'FirebaseService', 'Portal1Scraper', 'Portal2Scraper']
+__all__ = ['get_firebase_service', 'FirebaseService', 'Portal1Scraper', 'Portal2Scraper']
@@ -1,28 +1,80 @@
 import os
+import json
+import time
+import base64
+import shutil
+import hashlib
+import tempfile
+import threading
+from functools import lru_cache
 import firebase_admin
 from firebase_admin import credentials, firestore, storage
-from typing import Optional, List
+from typing import Generator, Optional, List, Tuple
+from dataclasses import fields
 from datetime import datetime
+from urllib.parse import urlsplit
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from app.models.paper import Paper
+from app.models.paper import Paper, tokenize, normalize_search
 
 
 class FirebaseService:
     """Service for Firebase Firestore and Storage operations."""
     
-    _instance = None
-    _initialized = False
+    # Maximum number of values Firestore accepts in an 'in' filter
+    IN_QUERY_LIMIT = 30
     
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
+    # Paper fields aggregated into the aggregates/filters document
+    FILTER_AGGREGATE_FIELDS = {
+        'year': 'years', 'semester': 'semesters', 'branch': 'branches', 'subject_name': 'subjects'
+    }
+    
+    # Aggregates returned by get_filter_options (the /filters dropdowns)
+    FILTER_OPTION_KEYS = ('years', 'semesters', 'branches')
+    
+    # How long (seconds) scanned unique values are cached in-process
+    UNIQUE_VALUES_CACHE_TTL = 300
+    
+    # Maximum search_tokens matches checked against the full search term,
+    # read SEARCH_PAGE_SIZE at a time
+    SEARCH_CANDIDATE_LIMIT = 500
+    SEARCH_PAGE_SIZE = 100
+    
+    # Documents read per page when scanning the whole collection
+    SCAN_PAGE_SIZE = 500
+    
+    # Maximum writes in one Firestore batch
+    BATCH_WRITE_LIMIT = 500
+    
+    # Stored fields needed to build a Paper (skips index-only fields like search_tokens)
+    PAPER_FIELDS = [f.name for f in fields(Paper) if f.name != 'id']
+    
+    # Fields returned by fuzzy_search_papers, and how long (seconds) they are cached
+    FUZZY_RESULT_FIELDS = [
+        'title', 'subject_code', 'subject_name', 'year', 'semester',
+        'branch', 'exam_type', 'pdf_url', 'storage_url'
+    ]
+    FUZZY_CACHE_TTL = 300
+    
+    # Connection pools for PDF downloads: hosts kept, and connections per host
+    HTTP_POOL_HOSTS = 32
+    HTTP_POOL_SIZE = 64
+    
+    # Resumable upload chunk (a multiple of 256 KB); bounds memory per upload
+    # for PDFs spooled to disk
+    UPLOAD_CHUNK_SIZE = 2 * 1024 * 1024
+    
+    # Maximum concurrent PDF downloads from one source host
+    HOST_CONCURRENCY = 8
+    
+    # Downloaded PDFs larger than this are spooled to disk rather than memory;
+    # only PDFs this small are uploaded in a single (in-memory) request
+    DOWNLOAD_SPOOL_SIZE = 256 * 1024
     
     def __init__(self):
-        if not FirebaseService._initialized:
-            self._initialize_firebase()
-            FirebaseService._initialized = True
+        self._initialize_firebase()
     
     def _initialize_firebase(self):
         """Initialize Firebase Admin SDK."""
@@ -35,25 +87,111 @@ class FirebaseService:
         if not os.path.exists(service_account_path):
             raise FileNotFoundError(f"Service account file not found at {service_account_path}")
         
-        cred = credentials.Certificate(service_account_path)
-        firebase_admin.initialize_app(cred, {
-            'storageBucket': 'pyqfinder.firebasestorage.app'
-        })
+        cred = _load_credentials(service_account_path)
+        try:
+            firebase_admin.initialize_app(cred, {
+                'storageBucket': 'pyqfinder.firebasestorage.app'
+            })
+        except ValueError:
+            # Default app already initialized (e.g. module reloaded)
+            pass
         
         # Use the pyq-finder database (not default)
         self.db = firestore.client(database_id='pyq-finder')
         self.bucket = storage.bucket()
         self.papers_collection = self.db.collection('papers')
+        self.filters_doc = self.db.collection('aggregates').document('filters')
+        self.meta_collection = self.db.collection('meta')
+        
+        # (fetched_at, papers, texts) for fuzzy_search_papers
+        self._fuzzy_cache = None
+        
+        # {field: (fetched_at, values)} for get_unique_values on non-aggregated fields
+        self._unique_cache = {}
+        
+        # Shared session so PDF downloads reuse connections and retry transient errors
+        self._http = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.HTTP_POOL_HOSTS,
+            pool_maxsize=self.HTTP_POOL_SIZE,
+            max_retries=Retry(total=3, status_forcelist=[429, 500, 502, 503, 504], backoff_factor=0.5)
+        )
+        self._http.mount('https://', adapter)
+        self._http.mount('http://', adapter)
+        
+        # Per-host download limits, created on first use
+        self._host_limits = {}
+        self._host_limits_lock = threading.Lock()
     
     # ==================== Paper Operations ====================
     
+    @staticmethod
+    def paper_doc_id(pdf_url: str) -> str:
+        """
+        Document ID of the paper with this PDF URL (SHA-1 of the URL).
+        
+        Deterministic IDs let existence checks read documents directly and
+        make re-adding the same paper overwrite instead of duplicate it.
+        """
+        return hashlib.sha1(pdf_url.encode()).hexdigest()
+    
     def add_paper(self, paper: Paper) -> str:
         """Add a new paper to Firestore."""
-        paper.created_at = datetime.utcnow()
-        paper.updated_at = datetime.utcnow()
+        doc_id = self.paper_doc_id(paper.pdf_url)
+        self.papers_collection.document(doc_id).set(self._paper_document(paper), merge=True)
+        self._update_filter_aggregates([paper])
+        self._fuzzy_cache = None
+        self._unique_cache.clear()
+        return doc_id
+    
+    def add_papers_bulk(self, papers: List[Paper]) -> int:
+        """
+        Add many new papers using a BulkWriter, which batches, parallelizes
+        and retries the writes instead of one round-trip per paper.
+        
+        Returns:
+            Number of papers written
+        """
+        if not papers:
+            return 0
+        
+        written = []
+        bulk = self.db.bulk_writer()
+        bulk.on_write_result(lambda reference, result, bulk_writer: written.append(reference))
+        
+        for paper in papers:
+            doc_ref = self.papers_collection.document(self.paper_doc_id(paper.pdf_url))
+            bulk.set(doc_ref, self._paper_document(paper), merge=True)
+        bulk.close()
+        
+        self._update_filter_aggregates(papers)
+        self._fuzzy_cache = None
+        self._unique_cache.clear()
+        return len(written)
+    
+    def _paper_document(self, paper: Paper) -> dict:
+        """Firestore fields for a new paper."""
+        data = paper.to_dict()
+        data['search_tokens'] = paper.search_tokens()
+        data['search_prefix'] = paper.search_prefix()
+        
+        # Native timestamps, set by the server, so created_at orders correctly
+        data['created_at'] = firestore.SERVER_TIMESTAMP
+        data['updated_at'] = firestore.SERVER_TIMESTAMP
+        return data
+    
+    def _update_filter_aggregates(self, papers: List[Paper]):
+        """Merge the filter values of new papers into aggregates/filters."""
+        updates = {}
+        for field, key in self.FILTER_AGGREGATE_FIELDS.items():
+            values = sorted({getattr(paper, field) for paper in papers if getattr(paper, field)})
+            if values:
+                updates[key] = values
+        
+        if not updates:
+            return
         
-        doc_ref = self.papers_collection.add(paper.to_dict())
-        return doc_ref[1].id
+        self.filters_doc.set({key: firestore.ArrayUnion(values) for key, values in updates.items()}, merge=True)
     
     def get_paper(self, paper_id: str) -> Optional[Paper]:
         """Get a paper by ID."""
@@ -71,9 +209,34 @@ class FirebaseService:
         branch: Optional[str] = None,
         subject: Optional[str] = None,
         limit: int = 50,
-        offset: int = 0
-    ) -> List[Paper]:
-        """Get papers with optional filters."""
+        start_after: Optional[str] = None
+    ) -> Tuple[List[Paper], Optional[str]]:
+        """
+        Get papers with optional filters.
+        
+        Uses cursor-based pagination: pass the `next_cursor` returned by the
+        previous page as `start_after`. Unlike offset(), Firestore does not
+        read (or bill) the documents before the cursor.
+        
+        Returns:
+            Tuple of (papers, next_cursor). next_cursor is None on the last page.
+        """
+        papers, next_cursor = self.get_papers_raw(year, semester, branch, subject, limit, start_after)
+        return [Paper.from_dict(data) for data in papers], next_cursor
+    
+    def get_papers_raw(
+        self,
+        year: Optional[str] = None,
+        semester: Optional[str] = None,
+        branch: Optional[str] = None,
+        subject: Optional[str] = None,
+        limit: int = 50,
+        start_after: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Same as get_papers, but returns JSON-ready dicts (see
+        Paper.raw_dict_from_firestore) for read-only callers like the API.
+        """
         query = self.papers_collection
         
         if year:
@@ -85,28 +248,92 @@ class FirebaseService:
         if subject:
             query = query.where('subject_name', '==', subject)
         
-        # Order by creation date
+        # Order by creation date, with document ID as a stable tiebreaker
         query = query.order_by('created_at', direction=firestore.Query.DESCENDING)
+        query = query.order_by('__name__', direction=firestore.Query.DESCENDING)
         
         # Pagination
-        query = query.limit(limit).offset(offset)
+        if start_after:
+            created_at, doc_id = self._decode_cursor(start_after)
+            query = query.start_after({
+                'created_at': created_at,
+                '__name__': self.papers_collection.document(doc_id)
+            })
+        query = query.select(self.PAPER_FIELDS).limit(limit)
         
         papers = []
+        last_doc = None
         for doc in query.stream():
-            data = doc.to_dict()
-            data['id'] = doc.id
-            papers.append(Paper.from_dict(data))
+            papers.append(Paper.raw_dict_from_firestore(doc))
+            last_doc = doc
         
-        return papers
+        next_cursor = None
+        if last_doc is not None and len(papers) == limit:
+            next_cursor = self._encode_cursor(last_doc.get('created_at'), last_doc.id)
+        
+        return papers, next_cursor
+    
+    @staticmethod
+    def _encode_cursor(created_at, doc_id: str) -> str:
+        """Encode the position of a document as an opaque pagination cursor."""
+        payload = {'id': doc_id}
+        if isinstance(created_at, datetime):
+            payload['created_at'] = created_at.isoformat()
+        else:
+            # Papers stored before server timestamps have ISO string dates
+            payload['created_at_str'] = created_at
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+    
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple:
+        """Decode a pagination cursor into (created_at, doc_id)."""
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if 'created_at' in data:
+                return datetime.fromisoformat(data['created_at']), data['id']
+            return data['created_at_str'], data['id']
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Invalid pagination cursor")
     
     def search_papers(self, search_term: str, limit: int = 50) -> List[Paper]:
-        """Search papers by subject name or title."""
-        # Firestore doesn't support full-text search, so we'll fetch and filter
-        # For production, consider using Algolia or Elasticsearch
+        """
+        Search papers by subject name, subject code or title.
+        
+        Firestore has no full-text search, so each paper stores:
+        - `search_prefix`: its lowercased "subject_name subject_code title",
+          so papers starting with the term are found with a range query
+        - `search_tokens`: its words. The longest word of the term (usually
+          the most selective) is looked up with array_contains and the
+          candidates are then matched against the full term.
+        """
+        search_lower = normalize_search(search_term)
+        if not search_lower:
+            return []
+        
         papers = []
-        search_lower = search_term.lower()
+        seen_ids = set()
         
-        for doc in self.papers_collection.limit(500).stream():
+        # Prefix hits, from the index on search_prefix
+        query = self.papers_collection.where('search_prefix', '>=', search_lower)
+        query = query.where('search_prefix', '<', search_lower + '\uf8ff')
+        for doc in query.select(self.PAPER_FIELDS).limit(limit).stream():
+            data = doc.to_dict()
+            data['id'] = doc.id
+            papers.append(Paper.from_dict(data))
+            seen_ids.add(doc.id)
+        
+        tokens = tokenize(search_term)
+        if len(papers) >= limit or not tokens:
+            return papers
+        
+        token = max(tokens, key=len)
+        query = self.papers_collection.where('search_tokens', 'array_contains', token)
+        query = query.select(self.PAPER_FIELDS)
+        
+        for doc in self._paged(query, self.SEARCH_PAGE_SIZE, self.SEARCH_CANDIDATE_LIMIT):
+            if doc.id in seen_ids:
+                continue
+            
             data = doc.to_dict()
             data['id'] = doc.id
             
@@ -115,7 +342,7 @@ class FirebaseService:
                 search_lower in data.get('subject_name', '').lower() or
                 search_lower in data.get('subject_code', '').lower()):
                 papers.append(Paper.from_dict(data))
-                
+            
             if len(papers) >= limit:
                 break
         
@@ -133,60 +360,101 @@ class FirebaseService:
         Returns:
             List of papers with similarity scores, sorted by best match
         """
+        import numpy as np
         from rapidfuzz import fuzz, process
         
-        # Fetch all papers (in production, consider caching or indexing)
+        all_papers, paper_texts = self._get_fuzzy_candidates()
+        
+        if not all_papers or not subject_names:
+            return []
+        
+        subjects_lower = [subject.lower() for subject in subject_names]
+        
+        # Score every (subject, paper) pair in one vectorized call per scorer.
+        # Token set ratio works well for subject names with different word orders,
+        # partial ratio catches substring matches; use the higher score.
+        scores = np.maximum(
+            process.cdist(subjects_lower, paper_texts, scorer=fuzz.token_set_ratio,
+                          score_cutoff=threshold, dtype=np.float64, workers=-1),
+            process.cdist(subjects_lower, paper_texts, scorer=fuzz.partial_ratio,
+                          score_cutoff=threshold, dtype=np.float64, workers=-1)
+        )
+        
+        # Best matching subject for each paper
+        best_subject = scores.argmax(axis=0)
+        best_score = scores[best_subject, np.arange(len(paper_texts))]
+        
+        # Sort by score (highest first) and return top results
+        matched = np.flatnonzero(best_score >= threshold)
+        top = matched[np.argsort(-best_score[matched], kind='stable')][:limit]
+        
+        return [
+            {
+                **all_papers[i],
+                'score': float(best_score[i]),
+                'matched_subject': subject_names[best_subject[i]]
+            }
+            for i in top
+        ]
+    
+    def _get_fuzzy_candidates(self) -> tuple:
+        """
+        All papers and their lowercased searchable text, for fuzzy matching.
+        
+        Cached in-process for FUZZY_CACHE_TTL seconds (and dropped by
+        add_paper) so repeated searches don't re-read the whole collection.
+        """
+        cached = self._fuzzy_cache
+        if cached and time.monotonic() - cached[0] < self.FUZZY_CACHE_TTL:
+            return cached[1], cached[2]
+        
         all_papers = []
-        for doc in self.papers_collection.stream():
+        for doc in self._paged(self.papers_collection.select(self.FUZZY_RESULT_FIELDS)):
             data = doc.to_dict()
             data['id'] = doc.id
             all_papers.append(data)
         
-        if not all_papers:
-            return []
+        # Combine subject_name, title, and subject_code for matching
+        paper_texts = [
+            f"{paper.get('subject_name', '')} {paper.get('title', '')} {paper.get('subject_code', '')}".lower()
+            for paper in all_papers
+        ]
         
-        # Build searchable text for each paper
-        paper_texts = []
-        for paper in all_papers:
-            # Combine subject_name, title, and subject_code for matching
-            text = f"{paper.get('subject_name', '')} {paper.get('title', '')} {paper.get('subject_code', '')}"
-            paper_texts.append(text.lower())
+        self._fuzzy_cache = (time.monotonic(), all_papers, paper_texts)
+        return all_papers, paper_texts
+    
+    def _paged(self, query, page_size: Optional[int] = None,
+               max_docs: Optional[int] = None) -> Generator:
+        """
+        Stream query results in pages ordered by document ID, each page
+        starting after the last document of the previous one.
         
-        # Find matches for each subject
-        matched_papers = {}
+        Keeps every RPC short instead of holding one stream open across the
+        whole collection, and a caller that stops early doesn't read ahead.
+        """
+        page_size = page_size or self.SCAN_PAGE_SIZE
+        query = query.order_by('__name__')
+        last_doc = None
+        read = 0
         
-        for subject in subject_names:
-            subject_lower = subject.lower()
+        while max_docs is None or read < max_docs:
+            size = page_size if max_docs is None else min(page_size, max_docs - read)
+            page = query.start_after(last_doc) if last_doc else query
             
-            for i, (paper, text) in enumerate(zip(all_papers, paper_texts)):
-                paper_id = paper['id']
-                
-                # Calculate similarity using multiple methods
-                # Token set ratio works well for subject names with different word orders
-                ratio = fuzz.token_set_ratio(subject_lower, text)
-                
-                # Also check partial ratio for substring matches
-                partial = fuzz.partial_ratio(subject_lower, text)
-                
-                # Use the higher score
-                score = max(ratio, partial)
-                
-                if score >= threshold:
-                    if paper_id not in matched_papers or matched_papers[paper_id]['score'] < score:
-                        matched_papers[paper_id] = {
-                            **paper,
-                            'score': score,
-                            'matched_subject': subject
-                        }
-        
-        # Sort by score (highest first) and return top results
-        results = sorted(matched_papers.values(), key=lambda x: x['score'], reverse=True)
-        return results[:limit]
+            count = 0
+            for doc in page.limit(size).stream():
+                count += 1
+                last_doc = doc
+                yield doc
+            
+            read += count
+            if count < size:
+                return
     
     def get_all_papers_for_search(self) -> List[dict]:
         """Get all papers for client-side searching."""
         papers = []
-        for doc in self.papers_collection.stream():
+        for doc in self._paged(self.papers_collection.select(self.PAPER_FIELDS)):
             data = doc.to_dict()
             data['id'] = doc.id
             papers.append(data)
@@ -194,8 +462,8 @@ class FirebaseService:
     
     def paper_exists(self, pdf_url: str) -> bool:
         """Check if a paper with the given PDF URL already exists."""
-        query = self.papers_collection.where('pdf_url', '==', pdf_url).limit(1)
-        return len(list(query.stream())) > 0
+        doc_ref = self.papers_collection.document(self.paper_doc_id(pdf_url))
+        return doc_ref.get(field_paths=['pdf_url']).exists
     
     def paper_exists_by_metadata(
         self, 
@@ -222,42 +490,315 @@ class FirebaseService:
         if exam_type:
             query = query.where('exam_type', '==', exam_type)
         
-        return len(list(query.limit(1).stream())) > 0
+        # Only the document name is needed to know it exists
+        query = query.select(['__name__']).limit(1)
+        return next(query.stream(), None) is not None
+    
+    def get_existing_pdf_urls(self, pdf_urls: List[str]) -> set:
+        """
+        Return the subset of pdf_urls that already exist in Firestore.
+        
+        Batched equivalent of paper_exists: the papers are read by their
+        paper_doc_id in one get_all call instead of one query per URL.
+        """
+        urls_by_id = {self.paper_doc_id(url): url for url in pdf_urls if url}
+        if not urls_by_id:
+            return set()
+        
+        doc_refs = [self.papers_collection.document(doc_id) for doc_id in urls_by_id]
+        return {
+            urls_by_id[snapshot.id]
+            for snapshot in self.db.get_all(doc_refs, field_paths=['pdf_url'])
+            if snapshot.exists
+        }
+    
+    def get_existing_metadata_keys(self, papers: List[Paper]) -> set:
+        """
+        Return metadata keys of stored papers that may duplicate the given ones.
+        
+        Batched equivalent of paper_exists_by_metadata: one query per
+        subject_code (with an 'in' filter on year). Check a paper against the
+        result with `metadata_key(paper) in keys`.
+        """
+        years_by_code = {}
+        for paper in papers:
+            if paper.subject_code and paper.year:
+                years_by_code.setdefault(paper.subject_code, set()).add(paper.year)
+        
+        keys = set()
+        field_names = ['subject_code', 'year', 'semester', 'exam_type']
+        
+        for subject_code, years in years_by_code.items():
+            years = sorted(years)
+            for i in range(0, len(years), self.IN_QUERY_LIMIT):
+                query = self.papers_collection.where('subject_code', '==', subject_code)
+                query = query.where('year', 'in', years[i:i + self.IN_QUERY_LIMIT])
+                for doc in query.select(field_names).stream():
+                    data = doc.to_dict()
+                    keys.update(self.metadata_match_keys(
+                        data.get('subject_code', ''),
+                        data.get('year', ''),
+                        data.get('semester', ''),
+                        data.get('exam_type', '')
+                    ))
+        
+        return keys
+    
+    @staticmethod
+    def metadata_key(paper: Paper) -> tuple:
+        """Key used to look a paper up in a set of metadata_match_keys."""
+        return (paper.subject_code, paper.year, paper.semester or None, paper.exam_type or None)
+    
+    @staticmethod
+    def metadata_match_keys(subject_code: str, year: str, semester: str, exam_type: str) -> List[tuple]:
+        """
+        All lookup keys a stored paper matches.
+        
+        Mirrors paper_exists_by_metadata: semester and exam_type only have to
+        match when the candidate paper has them set.
+        """
+        return [
+            (subject_code, year, sem, exam)
+            for sem in (semester or None, None)
+            for exam in (exam_type or None, None)
+        ]
     
     def get_unique_values(self, field: str) -> List[str]:
-        """Get unique values for a field (year, semester, branch, etc.)."""
+        """
+        Get unique values for a field (year, semester, branch, etc.).
+        
+        Aggregated fields are read from the aggregates/filters document kept
+        up to date by add_paper (a single read); other fields scan the
+        collection, and are cached for UNIQUE_VALUES_CACHE_TTL seconds.
+        """
+        key = self.FILTER_AGGREGATE_FIELDS.get(field)
+        if key:
+            return self._get_aggregates()[key]
+        
+        cached = self._unique_cache.get(field)
+        if cached and time.monotonic() - cached[0] < self.UNIQUE_VALUES_CACHE_TTL:
+            return cached[1]
+        
         values = set()
-        for doc in self.papers_collection.stream():
+        for doc in self._paged(self.papers_collection.select([field])):
             data = doc.to_dict()
             if field in data and data[field]:
                 values.add(data[field])
-        return sorted(list(values))
+        
+        values = sorted(list(values))
+        self._unique_cache[field] = (time.monotonic(), values)
+        return values
+    
+    def get_filter_options(self) -> dict:
+        """Unique years, semesters and branches, from one read of aggregates/filters."""
+        aggregates = self._get_aggregates()
+        return {key: aggregates[key] for key in self.FILTER_OPTION_KEYS}
+    
+    def _get_aggregates(self) -> dict:
+        """
+        The aggregates/filters document.
+        
+        Not cached in-process: scrapes update it from the Celery worker, and
+        /filters responses are already cached in Redis (cleared by run_scrape).
+        """
+        doc = self.filters_doc.get()
+        data = doc.to_dict() if doc.exists else {}
+        return {key: sorted(data.get(key, [])) for key in self.FILTER_AGGREGATE_FIELDS.values()}
+    
+    def rebuild_filter_aggregates(self):
+        """Recompute aggregates/filters from every stored paper."""
+        aggregate_fields = self.FILTER_AGGREGATE_FIELDS
+        values = {key: set() for key in aggregate_fields.values()}
+        
+        for doc in self._paged(self.papers_collection.select(list(aggregate_fields))):
+            data = doc.to_dict()
+            for field, key in aggregate_fields.items():
+                if data.get(field):
+                    values[key].add(data[field])
+        
+        self.filters_doc.set({key: sorted(items) for key, items in values.items()})
+    
+    def backfill_search_tokens(self) -> int:
+        """Write search_tokens/search_prefix on papers stored without them. Returns the number updated."""
+        def updates():
+            field_names = ['title', 'subject_name', 'subject_code', 'search_tokens', 'search_prefix']
+            for doc in self._paged(self.papers_collection.select(field_names)):
+                data = doc.to_dict()
+                if 'search_tokens' not in data or 'search_prefix' not in data:
+                    paper = Paper.from_dict(data)
+                    yield doc.reference, {
+                        'search_tokens': paper.search_tokens(),
+                        'search_prefix': paper.search_prefix()
+                    }
+        
+        return self._commit_updates(updates())
+    
+    def backfill_timestamps(self) -> int:
+        """Convert ISO string created_at/updated_at to native timestamps. Returns the number updated."""
+        def updates():
+            field_names = ['created_at', 'updated_at']
+            for doc in self._paged(self.papers_collection.select(field_names)):
+                data = doc.to_dict()
+                changes = {
+                    field: datetime.fromisoformat(data[field])
+                    for field in field_names
+                    if isinstance(data.get(field), str)
+                }
+                if changes:
+                    yield doc.reference, changes
+        
+        return self._commit_updates(updates())
+    
+    def rekey_papers(self) -> int:
+        """
+        Move papers stored under random IDs to their paper_doc_id (dropping
+        duplicates of the same URL). Returns the number moved.
+        """
+        batch = self.db.batch()
+        pending = 0
+        moved = 0
+        
+        for doc in self._paged(self.papers_collection):
+            data = doc.to_dict()
+            if not data.get('pdf_url'):
+                continue
+            
+            doc_id = self.paper_doc_id(data['pdf_url'])
+            if doc.id == doc_id:
+                continue
+            
+            batch.set(self.papers_collection.document(doc_id), data)
+            batch.delete(doc.reference)
+            pending += 2
+            moved += 1
+            
+            if pending >= self.BATCH_WRITE_LIMIT:
+                batch.commit()
+                batch = self.db.batch()
+                pending = 0
+        
+        if pending:
+            batch.commit()
+        
+        self._fuzzy_cache = None
+        return moved
+    
+    def _commit_updates(self, updates) -> int:
+        """Apply (doc_ref, update_fields) updates in batches of BATCH_WRITE_LIMIT. Returns the number applied."""
+        batch = self.db.batch()
+        pending = 0
+        updated = 0
+        
+        for doc_ref, update_fields in updates:
+            batch.update(doc_ref, update_fields)
+            pending += 1
+            updated += 1
+            
+            if pending >= self.BATCH_WRITE_LIMIT:
+                batch.commit()
+                batch = self.db.batch()
+                pending = 0
+        
+        if pending:
+            batch.commit()
+        
+        return updated
+    
+    def get_scrape_validators(self, portal: str) -> dict:
+        """HTTP validators (etag, last_modified) saved by the last complete scrape of a portal."""
+        doc = self.meta_collection.document(portal).get()
+        return doc.to_dict() if doc.exists else {}
+    
+    def set_scrape_validators(self, portal: str, validators: dict):
+        """Save HTTP validators for the next scrape of a portal."""
+        self.meta_collection.document(portal).set(validators)
     
     # ==================== Storage Operations ====================
     
-    def upload_pdf(self, pdf_url: str, destination_path: str) -> str:
-        """Download PDF from URL and upload to Firebase Storage."""
-        # Download PDF
-        response = requests.get(pdf_url, timeout=30)
-        response.raise_for_status()
-        
-        # Upload to Storage
-        blob = self.bucket.blob(destination_path)
-        blob.upload_from_string(
-            response.content,
-            content_type='application/pdf'
-        )
+    @staticmethod
+    def storage_path(portal: str, pdf_url: str) -> str:
+        """
+        Storage object path for a PDF, keyed by a hash of its URL.
+        
+        Titles contain slashes, unicode and duplicates, so they make poor
+        object names; the same URL always maps to the same object.
+        """
+        key = FirebaseService.paper_doc_id(pdf_url)
+        return f"papers/{portal}/{key[:2]}/{key}.pdf"
+    
+    def upload_pdf(self, pdf_url: str, destination_path: str, title: Optional[str] = None) -> str:
+        """
+        Download PDF from URL and stream it into Firebase Storage.
+        
+        Skips the download if the object already exists.
+        """
+        blob = self.bucket.blob(destination_path, chunk_size=self.UPLOAD_CHUNK_SIZE)
+        if blob.exists():
+            return blob.public_url
         
-        # Make publicly accessible
-        blob.make_public()
+        blob.metadata = {'title': title or '', 'source': pdf_url}
+        
+        with tempfile.SpooledTemporaryFile(max_size=self.DOWNLOAD_SPOOL_SIZE) as pdf_file:
+            # Only the download holds a slot for the source host; the upload
+            # below runs outside it, so uploads aren't capped at HOST_CONCURRENCY
+            with self._host_limit(pdf_url), self._http.get(pdf_url, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                shutil.copyfileobj(response.raw, pdf_file)
+            
+            # A known size of up to 8 MB makes the client read the whole file
+            # into one multipart request, so only pass it for PDFs that are
+            # already in memory; larger ones upload in UPLOAD_CHUNK_SIZE chunks
+            size = pdf_file.tell()
+            if size > self.DOWNLOAD_SPOOL_SIZE:
+                size = None
+            pdf_file.seek(0)
+            
+            # Upload to Storage, publicly readable (set in the same request)
+            blob.upload_from_file(
+                pdf_file,
+                size=size,
+                content_type='application/pdf',
+                predefined_acl='publicRead'
+            )
         
         return blob.public_url
     
+    def _host_limit(self, url: str) -> threading.Semaphore:
+        """Semaphore limiting concurrent downloads from the host of url."""
+        host = urlsplit(url).netloc
+        with self._host_limits_lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.Semaphore(self.HOST_CONCURRENCY)
+            return self._host_limits[host]
+    
     def get_download_url(self, storage_path: str) -> str:
         """Get download URL for a file in Storage."""
         blob = self.bucket.blob(storage_path)
         return blob.public_url
 
 
-# Singleton instance
-firebase_service = FirebaseService()
+@lru_cache(maxsize=None)
+def _load_credentials(service_account_path: str) -> credentials.Certificate:
+    """Parse the service account file once per path."""
+    return credentials.Certificate(service_account_path)
+
+
+_firebase_service = None
+_firebase_service_lock = threading.Lock()
+
+
+def get_firebase_service() -> FirebaseService:
+    """
+    Shared FirebaseService, created on first use.
+    
+    Lazy so importing the app (or a CLI that never touches Firestore) doesn't
+    read credentials or open gRPC channels; the lock keeps concurrent first
+    calls from initializing Firebase twice.
+    """
+    global _firebase_service
+    if _firebase_service is None:
+        with _firebase_service_lock:
+            if _firebase_service is None:
+                _firebase_service = FirebaseService()
+    return _firebase_service
@@ -1,14 +1,17 @@
 import re
-import time
+import logging
+from functools import lru_cache
 import requests
-from bs4 import BeautifulSoup
-from typing import List, Dict, Generator
+from selectolax.lexbor import LexborHTMLParser
+from typing import Dict, Generator, Optional
 from urllib.parse import urljoin, unquote
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 import threading
 
 from app.models.paper import Paper
 
+logger = logging.getLogger(__name__)
+
 
 class Portal1Scraper:
     """
@@ -20,13 +23,44 @@ class Portal1Scraper:
     
     BASE_URL = "https://mitmpllibportal.manipal.edu/question-papers"
     
-    def __init__(self, max_workers: int = 5):
+    # Branch folder names, checked in order (lowercased once for matching)
+    BRANCHES = (
+        "Chemical", "Civil", "Computer", "Electrical", "Electronics",
+        "Information Technology", "Mechanical", "Mechatronics",
+        "Automobile", "Aeronautical", "Biomedical", "Biotechnology",
+        "Industrial", "Instrumentation", "Computer and Communication",
+        "Architecture"
+    )
+    _BRANCHES_LC = tuple((branch.lower(), branch) for branch in BRANCHES)
+    
+    # Patterns used while parsing every link
+    _YEAR_RE = re.compile(r'20\d{2}')
+    _SEM_RE = re.compile(r'([IVX]+)\s*[Ss]em', re.IGNORECASE)
+    _MAKEUP_RE = re.compile(r'\s*\(?makeup\)?', re.IGNORECASE)
+    _CODE_RE = re.compile(r'\(([A-Z]{2,4}[\s-]*\d{4})\)')
+    _PAREN_RE = re.compile(r'\([^)]*\)')
+    _WS_RE = re.compile(r'\s+')
+    
+    # Roman numerals that occur as semesters
+    _ROMAN_SEM = {'I': 1, 'II': 2, 'III': 3, 'IV': 4, 'V': 5, 'VI': 6, 'VII': 7, 'VIII': 8}
+    
+    def __init__(self, max_workers: int = 5, validators: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            max_workers: Number of threads used to parse links
+            validators: 'etag' / 'last_modified' of the index page from the
+                last complete scrape, sent as a conditional GET
+        """
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
         self.max_workers = max_workers
         self._stop_event = threading.Event()
+        
+        # Updated from the index response; not_modified is set on a 304
+        self.validators = dict(validators or {})
+        self.not_modified = False
     
     def stop(self):
         """Signal the scraper to stop."""
@@ -40,16 +74,31 @@ class Portal1Scraper:
             concurrent: If True, use parallel processing for faster scraping
         """
         self._stop_event.clear()
-        print(f"[Portal1] Starting scrape from {self.BASE_URL}")
+        logger.info("[Portal1] Starting scrape from %s", self.BASE_URL)
+        
+        headers = {}
+        if self.validators.get('etag'):
+            headers['If-None-Match'] = self.validators['etag']
+        if self.validators.get('last_modified'):
+            headers['If-Modified-Since'] = self.validators['last_modified']
         
-        response = self.session.get(self.BASE_URL, timeout=30)
+        response = self.session.get(self.BASE_URL, headers=headers, timeout=30)
+        if response.status_code == 304:
+            logger.info("[Portal1] Index unchanged since the last scrape, nothing to do")
+            self.not_modified = True
+            return
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'lxml')
+        self.validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
         
-        # Find all PDF links
-        pdf_links = soup.find_all('a', href=lambda x: x and x.endswith('.pdf'))
-        print(f"[Portal1] Found {len(pdf_links)} PDF links")
+        tree = LexborHTMLParser(response.text)
+        
+        # Find all PDF links (the selector is matched in C, not per anchor in Python)
+        pdf_links = tree.css('a[href$=".pdf"]')
+        logger.info("[Portal1] Found %s PDF links", len(pdf_links))
         
         if concurrent and len(pdf_links) > 10:
             # Use concurrent processing for large batches
@@ -58,61 +107,75 @@ class Portal1Scraper:
             # Sequential processing for small batches
             for link in pdf_links:
                 if self._stop_event.is_set():
-                    print("[Portal1] Stop requested, stopping...")
+                    logger.info("[Portal1] Stop requested, stopping...")
                     break
                 try:
                     paper = self._parse_pdf_link(link)
                     if paper:
                         yield paper
                 except Exception as e:
-                    print(f"[Portal1] Error parsing link: {e}")
+                    logger.warning("[Portal1] Error parsing link: %s", e)
                     continue
     
     def _scrape_concurrent(self, pdf_links) -> Generator[Paper, None, None]:
-        """Process PDF links concurrently using ThreadPoolExecutor."""
-        papers_queue = []
-        
+        """
+        Process PDF links on a single ThreadPoolExecutor shared by all links,
+        yielding papers in link order as they are parsed.
+        """
         def process_link(link):
             if self._stop_event.is_set():
                 return None
             try:
                 return self._parse_pdf_link(link)
             except Exception as e:
-                print(f"[Portal1] Error parsing link: {e}")
+                logger.warning("[Portal1] Error parsing link: %s", e)
                 return None
         
-        # Process in batches to allow yielding results progressively
-        batch_size = self.max_workers * 2
-        
-        for i in range(0, len(pdf_links), batch_size):
-            if self._stop_event.is_set():
-                print("[Portal1] Stop requested, stopping...")
-                break
-            
-            batch = pdf_links[i:i + batch_size]
-            
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                futures = {executor.submit(process_link, link): link for link in batch}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            for paper in executor.map(process_link, pdf_links):
+                if self._stop_event.is_set():
+                    logger.info("[Portal1] Stop requested, stopping...")
+                    break
                 
-                for future in as_completed(futures):
-                    if self._stop_event.is_set():
-                        break
-                    
-                    paper = future.result()
-                    if paper:
-                        yield paper
-            
-            # Small delay between batches to be respectful
-            time.sleep(0.2)
+                if paper:
+                    yield paper
+        finally:
+            # Drop links not yet parsed (on stop, or if the consumer stops early)
+            executor.shutdown(wait=True, cancel_futures=True)
     
     def _parse_pdf_link(self, link) -> Paper:
         """Parse a PDF link and extract metadata."""
-        href = link.get('href', '')
+        href = link.attributes.get('href') or ''
         if not href:
             return None
         
+        pdf_url, title, subject_code, subject_name, year, semester, branch, exam_type = self._parse_href(href)
+        
+        return Paper(
+            title=title,
+            subject_code=subject_code,
+            subject_name=subject_name,
+            year=year,
+            semester=semester,
+            branch=branch,
+            exam_type=exam_type,
+            pdf_url=pdf_url,
+            portal="portal1"
+        )
+    
+    @classmethod
+    @lru_cache(maxsize=50000)
+    def _parse_href(cls, href: str) -> tuple:
+        """
+        Parse an href into (pdf_url, title, subject_code, subject_name, year,
+        semester, branch, exam_type).
+        
+        Depends only on the href, so results are cached across scrapes and a
+        re-scrape only parses links added since the last run.
+        """
         # Make absolute URL
-        pdf_url = urljoin(self.BASE_URL, href)
+        pdf_url = urljoin(cls.BASE_URL, href)
         
         # Extract info from URL path
         # Example: /sites/default/files/Question-Papers/2019/Question Papers Dec 2018-Jan 2019/III Sem/Chemical/...
@@ -122,88 +185,75 @@ class Portal1Scraper:
         parts = path.split('/')
         
         # Extract year
-        year = self._extract_year(path)
+        year = cls._extract_year(path)
         
         # Extract semester
-        semester = self._extract_semester(path)
+        semester = cls._extract_semester(path)
         
         # Extract branch
-        branch = self._extract_branch(path)
+        branch = cls._extract_branch(path)
         
         # Get filename and extract subject info
         filename = parts[-1] if parts else ""
-        subject_name, subject_code, exam_type = self._parse_filename(filename)
+        subject_name, subject_code, exam_type = cls._parse_filename(filename)
         
-        return Paper(
-            title=filename.replace('.pdf', ''),
-            subject_code=subject_code,
-            subject_name=subject_name,
-            year=year,
-            semester=semester,
-            branch=branch,
-            exam_type=exam_type,
-            pdf_url=pdf_url,
-            portal="portal1"
-        )
+        title = filename.replace('.pdf', '')
+        return pdf_url, title, subject_code, subject_name, year, semester, branch, exam_type
     
-    def _extract_year(self, path: str) -> str:
+    @classmethod
+    def _extract_year(cls, path: str) -> str:
         """Extract year from path."""
         # Look for 4-digit year
-        years = re.findall(r'20\d{2}', path)
-        if years:
-            return years[0]
+        year_match = cls._YEAR_RE.search(path)
+        if year_match:
+            return year_match.group(0)
         return ""
     
-    def _extract_semester(self, path: str) -> str:
+    @classmethod
+    def _extract_semester(cls, path: str) -> str:
         """Extract semester from path."""
         # Look for semester patterns like "III Sem", "I sem", "V Sem"
-        sem_match = re.search(r'([IVX]+)\s*[Ss]em', path, re.IGNORECASE)
+        sem_match = cls._SEM_RE.search(path)
         if sem_match:
             roman = sem_match.group(1).upper()
-            return f"Semester {self._roman_to_int(roman)}"
+            number = cls._ROMAN_SEM.get(roman) or cls._roman_to_int(roman)
+            return f"Semester {number}"
         return ""
     
-    def _extract_branch(self, path: str) -> str:
+    @classmethod
+    def _extract_branch(cls, path: str) -> str:
         """Extract branch from path."""
-        branches = [
-            "Chemical", "Civil", "Computer", "Electrical", "Electronics",
-            "Information Technology", "Mechanical", "Mechatronics",
-            "Automobile", "Aeronautical", "Biomedical", "Biotechnology",
-            "Industrial", "Instrumentation", "Computer and Communication",
-            "Architecture"
-        ]
-        
         path_lower = path.lower()
-        for branch in branches:
-            if branch.lower() in path_lower:
+        for branch_lower, branch in cls._BRANCHES_LC:
+            if branch_lower in path_lower:
                 return branch
         
         return ""
     
-    def _parse_filename(self, filename: str) -> tuple:
+    @classmethod
+    def _parse_filename(cls, filename: str) -> tuple:
         """Parse filename to extract subject name, code, and exam type."""
         # Remove .pdf extension
         name = filename.replace('.pdf', '')
         
-        # Check for Makeup
-        exam_type = "Regular"
-        if "makeup" in name.lower():
-            exam_type = "Makeup"
-            name = re.sub(r'\s*\(?[Mm]akeup\)?', '', name)
+        # Check for Makeup (detected and stripped in one pass)
+        name, makeup_count = cls._MAKEUP_RE.subn('', name)
+        exam_type = "Makeup" if makeup_count else "Regular"
         
         # Try to extract subject code (e.g., CHE 2104, ICT 2103)
-        code_match = re.search(r'\(([A-Z]{2,4}[\s-]*\d{4})\)', name)
+        code_match = cls._CODE_RE.search(name)
         subject_code = ""
         if code_match:
             subject_code = code_match.group(1).replace(' ', '-')
         
         # Clean up subject name
-        subject_name = re.sub(r'\([^)]*\)', '', name).strip()
-        subject_name = re.sub(r'\s+', ' ', subject_name)
+        subject_name = cls._PAREN_RE.sub('', name).strip()
+        subject_name = cls._WS_RE.sub(' ', subject_name)
         
         return subject_name, subject_code, exam_type
     
-    def _roman_to_int(self, roman: str) -> int:
+    @classmethod
+    def _roman_to_int(cls, roman: str) -> int:
         """Convert Roman numeral to integer."""
         values = {'I': 1, 'V': 5, 'X': 10}
         result = 0
@@ -1,8 +1,12 @@
+import os
 import re
+import logging
 import time
+import tempfile
+import queue
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Generator
-from urllib.parse import urljoin, unquote
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -13,8 +17,77 @@ from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
 from webdriver_manager.chrome import ChromeDriverManager
 
+try:
+    import fcntl
+except ImportError:  # Windows: profile slots are only guarded within a process
+    fcntl = None
+
 from app.models.paper import Paper
 
+logger = logging.getLogger(__name__)
+
+_driver_install_lock = threading.Lock()
+_driver_path = None
+
+
+def _get_driver_path() -> str:
+    """
+    Path to the chromedriver binary, installed once per process.
+    
+    ChromeDriverManager().install() checks versions (over the network on a
+    cold cache) on every call, so later drivers reuse the first result.
+    """
+    global _driver_path
+    if _driver_path is None:
+        # Parallel workers would otherwise download the driver at the same time
+        with _driver_install_lock:
+            if _driver_path is None:
+                _driver_path = ChromeDriverManager().install()
+    return _driver_path
+
+
+# Chrome profiles are kept between runs so the HTTP cache survives. A profile
+# can only be open in one browser at a time, so each concurrent driver takes
+# its own numbered slot, held by an exclusive lock on "<slot>.lock" beside the
+# profile; the lock also keeps other worker processes out of the slot.
+_PROFILE_ROOT = os.path.join(tempfile.gettempdir(), "pyq-finder-portal2")
+_profile_lock = threading.Lock()
+_profile_locks = {}  # slot -> open lock file
+
+
+def _try_lock(lock_file) -> bool:
+    """Take an exclusive, non-blocking lock on an open file."""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _acquire_profile() -> int:
+    """Reserve the lowest slot not in use by this or another process."""
+    os.makedirs(_PROFILE_ROOT, exist_ok=True)
+    with _profile_lock:
+        slot = 0
+        while True:
+            if slot not in _profile_locks:
+                lock_file = open(os.path.join(_PROFILE_ROOT, f"{slot}.lock"), 'a')
+                if _try_lock(lock_file):
+                    _profile_locks[slot] = lock_file
+                    return slot
+                lock_file.close()
+            slot += 1
+
+
+def _release_profile(slot: int):
+    with _profile_lock:
+        lock_file = _profile_locks.pop(slot, None)
+    if lock_file:
+        # Closing the file releases its lock
+        lock_file.close()
+
 
 class Portal2Scraper:
     """
@@ -34,13 +107,83 @@ class Portal2Scraper:
     
     # Timeouts in seconds
     PAGE_LOAD_TIMEOUT = 15
-    ELEMENT_TIMEOUT = 5
-    NAVIGATION_DELAY = 1.0
     
-    def __init__(self, headless: bool = True):
+    # Links that make up a folder listing; present once a page has loaded
+    LISTING_SELECTOR = "a[href*='__doPostBack'], a[href$='.pdf'], a[title='Go Back']"
+    
+    # Folder levels opened below a session (branch, then subject)
+    MAX_FOLDER_DEPTH = 2
+    
+    # Subresources the listings don't need, blocked in the browser. Scripts are
+    # kept (folder links navigate through the page's __doPostBack), and so are
+    # stylesheets: hidden links are told apart by their layout, see _LIST_LINKS_JS.
+    BLOCKED_URLS = [
+        '*.woff', '*.woff2', '*.ttf', '*.png', '*.jpg', '*.gif', '*.svg', '*.ico',
+        '*google-analytics.com*', '*googletagmanager.com*'
+    ]
+    
+    # Branch names, checked in order (lowercased once for matching)
+    BRANCHES = (
+        "Chemical", "Civil", "Computer", "Electrical", "Electronics",
+        "Information Technology", "Mechanical", "Mechatronics",
+        "Automobile", "Aeronautical", "Biomedical", "Biotechnology",
+        "Industrial", "Instrumentation", "Computer and Communication"
+    )
+    _BRANCHES_LC = tuple((branch.lower(), branch) for branch in BRANCHES)
+    
+    # Folders that hold portal documentation rather than papers (lowercased)
+    _SKIP_PATTERNS = tuple(pattern.lower() for pattern in (
+        'SOP', 'Standard Operating', 'Guidelines', 'Manual',
+        'Template', 'Format', 'Instructions', 'Help',
+        'Elsevier', 'Open Access', 'Copyright'
+    ))
+    
+    # Patterns used while parsing every PDF
+    _SEM_RE = re.compile(r'([IVX]+)\s*[Ss]em', re.IGNORECASE)
+    _MAKEUP_RE = re.compile(r'\s*\(?makeup\)?', re.IGNORECASE)
+    _CODE_RE = re.compile(r'\(([A-Z]{2,4}[\s-]*\d{4})\)')
+    _PAREN_RE = re.compile(r'\([^)]*\)')
+    _WS_RE = re.compile(r'\s+')
+    
+    # Roman numerals that occur as semesters
+    _ROMAN_SEM = {'I': 1, 'II': 2, 'III': 3, 'IV': 4, 'V': 5, 'VI': 6, 'VII': 7, 'VIII': 8}
+    
+    # Event target and argument of a "javascript:__doPostBack('target','arg')" link
+    _POSTBACK_RE = re.compile(r"__doPostBack\('([^']*)'\s*,\s*'([^']*)'\)")
+    
+    # Text and href of every postback link, and text and absolute URL of every
+    # PDF link, on the page in one WebDriver call. Hidden links get empty text,
+    # as with Selenium's element.text, so they aren't listed as folders; they
+    # stay in the list so indices match find_elements for the click fallback.
+    _LIST_LINKS_JS = """
+        const text = a => a.getClientRects().length > 0 ? a.innerText.trim() : '';
+        const postbacks = Array.from(document.querySelectorAll("a[href*='__doPostBack']"))
+            .map(a => [text(a), a.getAttribute('href') || '']);
+        const pdfs = Array.from(document.querySelectorAll("a[href$='.pdf']"))
+            .map(a => [text(a), a.href]);
+        return [postbacks, pdfs];
+    """
+    
+    # Click the visible ".." link, or else the visible "Go Back" button, and
+    # return it (or null)
+    _CLICK_BACK_JS = """
+        const visible = a => a.getClientRects().length > 0;
+        const back = Array.from(document.links).find(a => visible(a) && a.innerText.trim() === '..')
+            || Array.from(document.querySelectorAll("a[title='Go Back']")).find(visible);
+        if (back) back.click();
+        return back || null;
+    """
+    
+    def __init__(self, headless: bool = True, max_browsers: int = 4):
         self.headless = headless
+        self.max_browsers = max_browsers
         self.driver = None
+        self._profile = None
         self._stop_event = threading.Event()
+        
+        # PDF URLs already turned into papers this scrape, shared with workers
+        self._seen_urls = set()
+        self._seen_lock = threading.Lock()
         self._current_path = []  # Track navigation path for debugging
     
     def stop(self):
@@ -69,10 +212,30 @@ class Portal2Scraper:
             'profile.managed_default_content_settings.images': 2,  # Disable images
         })
         
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=options)
+        # Return from get() once the DOM is ready, not after every subresource;
+        # _wait_for_page_load waits for the listing itself
+        options.page_load_strategy = 'eager'
+        
+        # Reuse a profile from an earlier run so cached assets aren't fetched again
+        self._profile = _acquire_profile()
+        options.add_argument(f'--user-data-dir={os.path.join(_PROFILE_ROOT, str(self._profile))}')
+        options.add_argument('--disk-cache-size=104857600')  # 100 MB
+        
+        service = Service(_get_driver_path())
+        try:
+            self.driver = webdriver.Chrome(service=service, options=options)
+        except Exception:
+            _release_profile(self._profile)
+            self._profile = None
+            raise
         self.driver.set_page_load_timeout(self.PAGE_LOAD_TIMEOUT)
-        self.driver.implicitly_wait(self.ELEMENT_TIMEOUT)
+        
+        # Explicit waits only; an implicit wait would also stall every empty find_elements
+        self.driver.implicitly_wait(0)
+        
+        # Skip stylesheets, fonts, images and analytics on every postback
+        self.driver.execute_cdp_cmd('Network.enable', {})
+        self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.BLOCKED_URLS})
     
     def _close_driver(self):
         """Close Chrome driver."""
@@ -82,229 +245,295 @@ class Portal2Scraper:
             except:
                 pass
             self.driver = None
+        
+        if self._profile is not None:
+            _release_profile(self._profile)
+            self._profile = None
     
     def scrape_all(self, years: List[str] = None) -> Generator[Paper, None, None]:
         """
         Scrape all papers from Portal 2.
         
+        Years are independent, so each is scraped in its own browser, up to
+        max_browsers at once; papers are yielded as the workers find them.
+        
         Args:
             years: Optional list of years to scrape (e.g., ['2023', '2024']).
                    If None, scrapes all available years.
         """
         self._stop_event.clear()
+        self._seen_urls.clear()
         
+        try:
+            available_years = self._list_years()
+        except Exception as e:
+            logger.error("[Portal2] Fatal error: %s", e)
+            return
+        
+        # Skip if specific years requested and this isn't one of them
+        selected_years = [year for year in available_years if not years or year in years]
+        if not selected_years:
+            return
+        
+        papers = queue.Queue()
+        done = object()
+        
+        def scrape_year(year: str):
+            worker = Portal2Scraper(headless=self.headless)
+            worker._stop_event = self._stop_event
+            worker._seen_urls = self._seen_urls
+            worker._seen_lock = self._seen_lock
+            try:
+                for paper in worker._scrape_year(year):
+                    papers.put(paper)
+            except Exception as e:
+                logger.warning("[Portal2] Error in year %s: %s", year, e)
+            finally:
+                papers.put(done)
+        
+        executor = ThreadPoolExecutor(max_workers=min(self.max_browsers, len(selected_years)))
+        remaining = len(selected_years)
+        try:
+            for year in selected_years:
+                executor.submit(scrape_year, year)
+            
+            while remaining:
+                paper = papers.get()
+                if paper is done:
+                    remaining -= 1
+                else:
+                    yield paper
+        finally:
+            # The consumer stopped early: stop the workers too
+            if remaining:
+                self._stop_event.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    def _list_years(self) -> List[str]:
+        """Names of the year folders at the portal root."""
         try:
             self._init_driver()
-            print(f"[Portal2] Starting scrape from {self.BASE_URL}")
+            logger.info("[Portal2] Starting scrape from %s", self.BASE_URL)
             
             self.driver.get(self.BASE_URL)
             self._wait_for_page_load()
             
             # Get available years
             available_years = self._get_folder_links()
-            print(f"[Portal2] Found {len(available_years)} years")
+            logger.info("[Portal2] Found %s years", len(available_years))
+            return [year_info['text'] for year_info in available_years]
+        finally:
+            self._close_driver()
+    
+    def _scrape_year(self, year: str) -> Generator[Paper, None, None]:
+        """Scrape one year folder, in this scraper's own browser."""
+        try:
+            self._init_driver()
+            self.driver.get(self.BASE_URL)
+            self._wait_for_page_load()
+            
+            year_info = next((f for f in self._get_folder_links() if f['text'] == year), None)
+            if year_info is None or self._should_stop():
+                return
+            
+            logger.info("[Portal2] Processing year: %s", year)
+            self._current_path = [year]
             
-            for year_info in available_years:
+            # Click on year folder with retry
+            if not self._safe_click_folder(year_info):
+                return
+            
+            # Get exam session folders (e.g., "Dec 2022 - Jan 2023")
+            session_folders = self._get_folder_links()
+            
+            for session_info in session_folders:
                 if self._should_stop():
-                    print("[Portal2] Stop requested, exiting...")
+                    logger.info("[Portal2] Stop requested, exiting...")
                     break
                 
-                year = year_info['text']
-                
-                # Skip if specific years requested and this isn't one of them
-                if years and year not in years:
-                    continue
-                
-                print(f"[Portal2] Processing year: {year}")
-                self._current_path = [year]
+                session = session_info['text']
+                logger.info("[Portal2]   Session: %s", session)
+                self._current_path = [year, session]
                 
-                # Click on year folder with retry
-                if not self._safe_click_folder(year_info['index']):
+                # Click on session folder
+                if not self._safe_click_folder(session_info):
                     continue
                 
-                # Get exam session folders (e.g., "Dec 2022 - Jan 2023")
-                session_folders = self._get_folder_links()
-                
-                for session_info in session_folders:
-                    if self._should_stop():
-                        break
-                    
-                    session = session_info['text']
-                    print(f"[Portal2]   Session: {session}")
-                    self._current_path = [year, session]
-                    
-                    # Click on session folder
-                    if not self._safe_click_folder(session_info['index']):
-                        continue
-                    
-                    # Now we should see branches/semesters
-                    try:
-                        yield from self._scrape_branch_level(year, session)
-                    except Exception as e:
-                        print(f"[Portal2] Error in branch level: {e}")
-                    
-                    # Go back to year level
-                    self._safe_go_back()
+                # Now we should see branches/semesters
+                try:
+                    yield from self._scrape_branch_level(year, session)
+                except Exception as e:
+                    logger.warning("[Portal2] Error in branch level: %s", e)
                 
-                # Go back to root
+                # Go back to year level
                 self._safe_go_back()
-                
-        except Exception as e:
-            print(f"[Portal2] Fatal error: {e}")
         finally:
             self._close_driver()
     
     def _scrape_branch_level(self, year: str, session: str) -> Generator[Paper, None, None]:
-        """Scrape papers from branch/semester level."""
+        """
+        Scrape papers from branch/semester level.
+        
+        Walks the folders depth-first with an explicit stack. Each entry is an
+        open folder: its path below the session and the subfolders still to
+        visit. The browser goes back one level whenever an entry is finished.
+        """
         if self._should_stop():
             return
         
-        folders = self._get_folder_links()
-        pdf_links = self._get_pdf_links()
+        folders, pdf_links = self._get_links()
         
         # First yield any PDFs at this level
-        for pdf_info in pdf_links:
-            if self._should_stop():
-                return
-            paper = self._create_paper(pdf_info, year, session, "", "")
-            if paper:
-                yield paper
+        yield from self._new_papers(pdf_links, year, session, "", "")
         
-        # Then recurse into folders (limit depth to avoid infinite loops)
-        for folder_info in folders:
+        # Then descend into folders (limit depth to avoid infinite loops)
+        stack = [([], iter(folders))]
+        while stack:
             if self._should_stop():
                 return
             
-            folder_name = folder_info['text']
-            
-            # Skip common non-paper folders
-            if self._should_skip_folder(folder_name):
-                print(f"[Portal2]     Skipping: {folder_name}")
+            path, pending = stack[-1]
+            folder_info = next(pending, None)
+            if folder_info is None:
+                # Done with this folder; the session level is left by the caller
+                stack.pop()
+                if stack:
+                    self._safe_go_back()
                 continue
             
-            print(f"[Portal2]     Folder: {folder_name}")
+            folder_name = folder_info['text']
+            depth = len(path)
             
-            if not self._safe_click_folder(folder_info['index']):
+            if depth == 0:
+                # Skip common non-paper folders
+                if self._should_skip_folder(folder_name):
+                    logger.debug("[Portal2]     Skipping: %s", folder_name)
+                    continue
+                
+                logger.debug("[Portal2]     Folder: %s", folder_name)
+            
+            if not self._safe_click_folder(folder_info):
                 continue
             
             # Check for PDFs or more folders
-            sub_folders = self._get_folder_links()
-            pdf_links = self._get_pdf_links()
+            sub_folders, pdf_links = self._get_links()
+            folder_path = path + [folder_name]
             
             if pdf_links:
-                # We're at the leaf level with PDFs
-                for pdf_info in pdf_links:
-                    if self._should_stop():
-                        break
-                    paper = self._create_paper(pdf_info, year, session, folder_name, "")
-                    if paper:
-                        yield paper
+                folder1, folder2 = (folder_path + [""])[:2]
+                yield from self._new_papers(pdf_links, year, session, folder1, folder2)
             
-            if sub_folders and len(sub_folders) < 50:  # Limit subfolder recursion
+            if depth + 1 < self.MAX_FOLDER_DEPTH and sub_folders and len(sub_folders) < 50:  # Limit subfolder recursion
                 # More nesting - likely subject folders
-                for sub_folder in sub_folders[:30]:  # Limit to first 30 subfolders
-                    if self._should_stop():
-                        break
-                    
-                    if not self._safe_click_folder(sub_folder['index']):
-                        continue
-                    
-                    inner_pdfs = self._get_pdf_links()
-                    for pdf_info in inner_pdfs:
-                        if self._should_stop():
-                            break
-                        paper = self._create_paper(pdf_info, year, session, folder_name, sub_folder['text'])
-                        if paper:
-                            yield paper
-                    
-                    self._safe_go_back()
+                stack.append((folder_path, iter(sub_folders[:30])))  # Limit to first 30 subfolders
+            else:
+                self._safe_go_back()
+    
+    def _new_papers(self, pdf_links: List[dict], year: str, session: str,
+                    folder1: str, folder2: str) -> Generator[Paper, None, None]:
+        """
+        Papers for the PDFs on the current page, skipping URLs already seen in
+        this scrape (the same PDF can be linked from several folders).
+        """
+        for pdf_info in pdf_links:
+            if self._should_stop():
+                return
             
-            self._safe_go_back()
+            with self._seen_lock:
+                if pdf_info['url'] in self._seen_urls:
+                    continue
+                self._seen_urls.add(pdf_info['url'])
+            
+            paper = self._create_paper(pdf_info, year, session, folder1, folder2)
+            if paper:
+                yield paper
     
     def _should_skip_folder(self, name: str) -> bool:
         """Check if folder should be skipped."""
-        skip_patterns = [
-            'SOP', 'Standard Operating', 'Guidelines', 'Manual',
-            'Template', 'Format', 'Instructions', 'Help',
-            'Elsevier', 'Open Access', 'Copyright'
-        ]
         name_lower = name.lower()
-        return any(pattern.lower() in name_lower for pattern in skip_patterns)
+        return any(pattern in name_lower for pattern in self._SKIP_PATTERNS)
     
-    def _wait_for_page_load(self, timeout: float = None):
-        """Wait for page to finish loading."""
-        timeout = timeout or self.ELEMENT_TIMEOUT
+    def _wait_for_page_load(self, anchor=None, timeout: float = None):
+        """
+        Wait for a navigation to finish: for `anchor` (an element of the old
+        page) to go stale, then for the new listing to appear. Returns as soon
+        as the page is ready instead of sleeping a fixed delay.
+        """
+        timeout = timeout or self.PAGE_LOAD_TIMEOUT
+        wait = WebDriverWait(self.driver, timeout, poll_frequency=0.1)
         try:
-            WebDriverWait(self.driver, timeout).until(
-                lambda d: d.execute_script('return document.readyState') == 'complete'
-            )
+            if anchor is not None:
+                wait.until(EC.staleness_of(anchor))
+            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, self.LISTING_SELECTOR)))
         except TimeoutException:
             pass
-        time.sleep(self.NAVIGATION_DELAY)
     
-    def _get_folder_links(self) -> List[dict]:
-        """Get all folder links on current page."""
+    def _listing_anchor(self):
+        """An element of the current listing, to tell when a postback has replaced it."""
+        elements = self.driver.find_elements(By.CSS_SELECTOR, self.LISTING_SELECTOR)
+        return elements[0] if elements else None
+    
+    def _get_links(self) -> tuple:
+        """
+        Get the folder links and PDF links on the current page, as
+        (folders, pdfs), from a single script call.
+        """
         folders = []
+        pdfs = []
         try:
-            # Wait a bit for elements to load
-            time.sleep(0.5)
+            postback_links, pdf_links = self.driver.execute_script(self._LIST_LINKS_JS)
             
-            # Find folder icons and their associated links
-            elements = self.driver.find_elements(By.CSS_SELECTOR, "a[href*='__doPostBack']")
+            # Folder links, with the postback each one triggers
+            for i, (text, href) in enumerate(postback_links):
+                if text and not text.endswith('.pdf') and text != '..':
+                    postback = self._POSTBACK_RE.search(href)
+                    folders.append({
+                        'text': text,
+                        'index': i,
+                        'postback': postback.groups() if postback else None
+                    })
             
-            for i, elem in enumerate(elements):
-                try:
-                    text = elem.text.strip()
-                    if text and not text.endswith('.pdf') and text != '..':
-                        folders.append({
-                            'text': text,
-                            'index': i
-                        })
-                except StaleElementReferenceException:
-                    continue
+            for text, href in pdf_links:
+                if href:
+                    pdfs.append({
+                        'text': text or href.split('/')[-1],
+                        'url': href
+                    })
                     
         except Exception as e:
-            print(f"[Portal2] Error getting folders: {e}")
+            logger.warning("[Portal2] Error getting links: %s", e)
         
-        return folders
+        return folders, pdfs
     
-    def _get_pdf_links(self) -> List[dict]:
-        """Get all PDF links on current page."""
-        pdfs = []
-        try:
-            elements = self.driver.find_elements(By.CSS_SELECTOR, "a[href$='.pdf']")
-            
-            for elem in elements:
-                try:
-                    href = elem.get_attribute('href')
-                    text = elem.text.strip()
-                    if href:
-                        pdfs.append({
-                            'text': text or href.split('/')[-1],
-                            'url': href
-                        })
-                except StaleElementReferenceException:
-                    continue
-                    
-        except Exception as e:
-            print(f"[Portal2] Error getting PDFs: {e}")
-        
-        return pdfs
+    def _get_folder_links(self) -> List[dict]:
+        """Get all folder links on current page."""
+        return self._get_links()[0]
     
-    def _safe_click_folder(self, index: int, retries: int = 2) -> bool:
-        """Click on a folder by index with retry logic."""
+    def _safe_click_folder(self, folder: dict, retries: int = 2) -> bool:
+        """
+        Open a folder from _get_folder_links with retry logic.
+        
+        Runs the folder's __doPostBack directly, which needs no element lookup
+        and can't go stale; falls back to clicking the link by index.
+        """
         for attempt in range(retries):
             try:
+                if folder['postback']:
+                    anchor = self._listing_anchor()
+                    self.driver.execute_script("__doPostBack(arguments[0], arguments[1]);", *folder['postback'])
+                    self._wait_for_page_load(anchor)
+                    return True
+                
                 elements = self.driver.find_elements(By.CSS_SELECTOR, "a[href*='__doPostBack']")
-                if index < len(elements):
-                    elements[index].click()
-                    self._wait_for_page_load()
+                if folder['index'] < len(elements):
+                    elements[folder['index']].click()
+                    self._wait_for_page_load(elements[folder['index']])
                     return True
             except StaleElementReferenceException:
                 time.sleep(0.5)
                 continue
             except Exception as e:
-                print(f"[Portal2] Error clicking folder (attempt {attempt + 1}): {e}")
+                logger.warning("[Portal2] Error clicking folder (attempt %s): %s", attempt + 1, e)
                 time.sleep(0.5)
         return False
     
@@ -312,28 +541,21 @@ class Portal2Scraper:
         """Go back to parent folder with retry logic."""
         for attempt in range(retries):
             try:
-                # Look for ".." link (most common back navigation)
-                back_links = self.driver.find_elements(By.LINK_TEXT, "..")
-                if back_links:
-                    back_links[0].click()
-                    self._wait_for_page_load()
-                    return True
+                # Find and click the back link in one round trip
+                back = self.driver.execute_script(self._CLICK_BACK_JS)
                 
-                # Or try the go back button if present
-                back_buttons = self.driver.find_elements(By.CSS_SELECTOR, "a[title='Go Back']")
-                if back_buttons:
-                    back_buttons[0].click()
-                    self._wait_for_page_load()
-                    return True
-                    
                 # If no back button, we might be at root
-                return False
+                if back is None:
+                    return False
+                
+                self._wait_for_page_load(back)
+                return True
                 
             except StaleElementReferenceException:
                 time.sleep(0.5)
                 continue
             except Exception as e:
-                print(f"[Portal2] Error going back (attempt {attempt + 1}): {e}")
+                logger.warning("[Portal2] Error going back (attempt %s): %s", attempt + 1, e)
                 time.sleep(0.5)
         return False
     
@@ -348,10 +570,11 @@ class Portal2Scraper:
             subject_name, subject_code, exam_type = self._parse_filename(filename)
             
             # Determine semester from folder structure
-            semester = self._extract_semester(folder1 + " " + folder2)
+            folders = f"{folder1} {folder2}"
+            semester = self._extract_semester(folders)
             
             # Determine branch
-            branch = self._extract_branch(folder1 + " " + folder2 + " " + filename)
+            branch = self._extract_branch(f"{folders} {filename}".lower())
             
             return Paper(
                 title=filename.replace('.pdf', ''),
@@ -365,48 +588,40 @@ class Portal2Scraper:
                 portal="portal2"
             )
         except Exception as e:
-            print(f"[Portal2] Error creating paper: {e}")
+            logger.warning("[Portal2] Error creating paper: %s", e)
             return None
     
     def _parse_filename(self, filename: str) -> tuple:
         """Parse filename to extract subject info."""
         name = filename.replace('.pdf', '')
         
-        exam_type = "Regular"
-        if "makeup" in name.lower():
-            exam_type = "Makeup"
-            name = re.sub(r'\s*\(?[Mm]akeup\)?', '', name)
+        # Detect and strip the marker in one pass
+        name, makeup_count = self._MAKEUP_RE.subn('', name)
+        exam_type = "Makeup" if makeup_count else "Regular"
         
-        code_match = re.search(r'\(([A-Z]{2,4}[\s-]*\d{4})\)', name)
+        code_match = self._CODE_RE.search(name)
         subject_code = ""
         if code_match:
             subject_code = code_match.group(1).replace(' ', '-')
         
-        subject_name = re.sub(r'\([^)]*\)', '', name).strip()
-        subject_name = re.sub(r'\s+', ' ', subject_name)
+        subject_name = self._PAREN_RE.sub('', name).strip()
+        subject_name = self._WS_RE.sub(' ', subject_name)
         
         return subject_name, subject_code, exam_type
     
     def _extract_semester(self, text: str) -> str:
         """Extract semester from text."""
-        sem_match = re.search(r'([IVX]+)\s*[Ss]em', text, re.IGNORECASE)
+        sem_match = self._SEM_RE.search(text)
         if sem_match:
             roman = sem_match.group(1).upper()
-            return f"Semester {self._roman_to_int(roman)}"
+            number = self._ROMAN_SEM.get(roman) or self._roman_to_int(roman)
+            return f"Semester {number}"
         return ""
     
-    def _extract_branch(self, text: str) -> str:
-        """Extract branch from text."""
-        branches = [
-            "Chemical", "Civil", "Computer", "Electrical", "Electronics",
-            "Information Technology", "Mechanical", "Mechatronics",
-            "Automobile", "Aeronautical", "Biomedical", "Biotechnology",
-            "Industrial", "Instrumentation", "Computer and Communication"
-        ]
-        
-        text_lower = text.lower()
-        for branch in branches:
-            if branch.lower() in text_lower:
+    def _extract_branch(self, text_lower: str) -> str:
+        """Extract branch from already-lowercased text."""
+        for branch_lower, branch in self._BRANCHES_LC:
+            if branch_lower in text_lower:
                 return branch
         return ""
     
@@ -0,0 +1,32 @@
+"""
+One-off maintenance for papers stored before the current data model.
+
+Usage:
+    python backfill.py
+"""
+from app.services.firebase_service import get_firebase_service
+
+
+def main():
+    firebase_service = get_firebase_service()
+    
+    print("Rebuilding aggregates/filters...")
+    firebase_service.rebuild_filter_aggregates()
+    
+    print("Adding search_tokens and search_prefix...")
+    updated = firebase_service.backfill_search_tokens()
+    print(f"Updated {updated} papers.")
+    
+    print("Converting string timestamps...")
+    updated = firebase_service.backfill_timestamps()
+    print(f"Updated {updated} papers.")
+    
+    print("Moving papers to URL-hash document IDs...")
+    moved = firebase_service.rekey_papers()
+    print(f"Moved {moved} papers.")
+    
+    print("Done.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""
+Gunicorn settings for production.
+
+Usage:
+    gunicorn -c gunicorn.conf.py main:app
+
+gevent workers let each process serve many requests while they wait on
+Firestore RPCs, instead of one request per worker.
+"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+worker_class = 'gevent'
+worker_connections = 1000
+
+
+def post_fork(server, worker):
+    # gRPC (used by Firestore) only yields to other greenlets once it is
+    # initialized for gevent, which must happen after monkey-patching
+    from gevent import monkey
+    monkey.patch_all()
+    
+    import grpc.experimental.gevent as grpc_gevent
+    grpc_gevent.init_gevent()
@@ -1,6 +1,7 @@
 from app import create_app
 
 app = create_app()
+celery_app = app.extensions['celery']
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)